@@ -1,6 +1,7 @@
 from auto_sbatch import processes
 from auto_sbatch.experiment_handler import ExperimentHandler
 from auto_sbatch.grid_search import GridSearch
+from auto_sbatch.preflight import PreflightError, PreflightLimits
 from auto_sbatch.sbatch import SBatch
 from auto_sbatch.slurm_script import SlurmScriptParser
 
@@ -8,6 +9,8 @@ __all__ = [
     "processes",
     "ExperimentHandler",
     "GridSearch",
+    "PreflightError",
+    "PreflightLimits",
     "SBatch",
     "SlurmScriptParser",
 ]
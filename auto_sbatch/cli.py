@@ -0,0 +1,250 @@
+import argparse
+import sys
+from collections.abc import Iterable, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from auto_sbatch.experiment_handler import ExperimentHandler
+from auto_sbatch.grid_search import GridSearch
+from auto_sbatch.preflight import PreflightLimits
+from auto_sbatch.sbatch import SBatch
+
+DEFAULT_COMMAND = "python {script_name} {all_params}"
+
+SPEC_KEYS = {
+    "command",
+    "script_name",
+    "slurm",
+    "params",
+    "grid_search",
+    "experiment_handler",
+    "run",
+    "limits",
+    "commands",
+    "post_commands",
+    "results_dir",
+    "requeue_signal_time",
+    "param_encoding",
+}
+GRID_SEARCH_KEYS = {"values", "exclude"}
+RUN_KEYS = {"task_id", "schedule_all_tasks", "save_script", "main_command_args"}
+EXPERIMENT_HANDLER_KEYS = {
+    "script_location",
+    "work_directory",
+    "run_work_directory",
+    "python_environment",
+    "pre_modules",
+    "run_modules",
+    "additional_scripts",
+    "setup_experiment",
+    "exclude_in_rsync",
+    "stable_job_directory",
+}
+LIMITS_KEYS = {
+    "max_jobs",
+    "max_array_size",
+    "max_script_bytes",
+    "max_core_hours",
+    "max_gpu_hours",
+    "max_rsync_bytes",
+}
+
+
+def _check_keys(table: Any, allowed: Iterable[str], name: str) -> None:
+    if not isinstance(table, Mapping):
+        raise ValueError(f"{name} must be a table.")
+    unknown = sorted(set(table.keys()) - set(allowed))
+    if len(unknown):
+        raise ValueError(
+            f"Unknown keys in {name}: {', '.join(map(str, unknown))}. "
+            f"Allowed keys are {', '.join(sorted(allowed))}."
+        )
+
+
+def load_spec(path: str | Path) -> dict[str, Any]:
+    """
+    Loads a sweep spec from a TOML or YAML file.
+    YAML support requires PyYAML, which is only imported when needed.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        import tomllib
+
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ValueError(
+                f"PyYAML is required to read {path}. Install it with "
+                f"`pip install pyyaml` or use a TOML spec."
+            ) from e
+
+        with open(path) as f:
+            try:
+                spec = yaml.safe_load(f) or {}
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid YAML: {e}") from e
+    else:
+        raise ValueError(
+            f"Unknown spec format {suffix!r} for {path}. Use .toml, .yaml or .yml."
+        )
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"Spec {path} must be a mapping at the top level.")
+    _check_keys(spec, SPEC_KEYS, "the spec")
+    return dict(spec)
+
+
+def _make_grid_search(spec: Mapping[str, Any]) -> GridSearch | None:
+    grid_spec = spec.get("grid_search")
+    if grid_spec is None:
+        return None
+    _check_keys(grid_spec, GRID_SEARCH_KEYS, "grid_search")
+    if "values" not in grid_spec:
+        raise ValueError("grid_search must define a `values` table.")
+    return GridSearch(grid_spec["values"], grid_spec.get("exclude"))
+
+
+def _make_experiment_handler(
+    spec: Mapping[str, Any], root: Path
+) -> ExperimentHandler | None:
+    handler_spec = spec.get("experiment_handler")
+    if handler_spec is None:
+        return None
+    _check_keys(handler_spec, EXPERIMENT_HANDLER_KEYS, "experiment_handler")
+    handler_spec = dict(handler_spec)
+    if "script_location" not in handler_spec:
+        raise ValueError("experiment_handler must define `script_location`.")
+    work_directory = Path(handler_spec.pop("work_directory", "."))
+    if not work_directory.is_absolute():
+        work_directory = root / work_directory
+    return ExperimentHandler(work_directory=work_directory, **handler_spec)
+
+
+def build_sbatch(
+    spec: Mapping[str, Any], root: str | Path = ".", prepare: bool = True
+) -> SBatch:
+    """
+    Builds an SBatch object from a sweep spec.
+
+    Args:
+        spec: the loaded spec (see `load_spec`).
+        root: directory against which a relative `results_dir` and
+            `work_directory` of the experiment handler are resolved.
+        prepare: whether to run the local preparation of the experiment
+            handler (module loading, environment setup, additional scripts).
+    """
+    results_dir = spec.get("results_dir")
+    if results_dir is not None:
+        results_dir = Path(root) / results_dir
+    sbatch = SBatch(
+        spec.get("slurm"),
+        spec.get("params"),
+        grid_search=_make_grid_search(spec),
+        script_name=spec.get("script_name"),
+        results_dir=results_dir,
+        requeue_signal_time=spec.get("requeue_signal_time"),
+        param_encoding=spec.get("param_encoding", "str"),
+    )
+    handler = _make_experiment_handler(spec, Path(root))
+    if handler is not None:
+        sbatch.configure_from_experiment_handler(handler, prepare=prepare)
+    sbatch.add_commands(spec.get("commands", []))
+    sbatch.add_commands(spec.get("post_commands", []), post=True)
+    return sbatch
+
+
+def submit_spec(
+    path: str | Path,
+    dry_run: bool = False,
+    render_only: bool = False,
+    preflight: bool = False,
+) -> bool:
+    """
+    Returns:
+        False if the preflight estimation exceeds the limits of the spec.
+    """
+    path = Path(path)
+    spec = load_spec(path)
+    run_spec = spec.get("run", {})
+    _check_keys(run_spec, RUN_KEYS, "run")
+    limits = None
+    if "limits" in spec:
+        _check_keys(spec["limits"], LIMITS_KEYS, "limits")
+        limits = PreflightLimits(**spec["limits"])
+    sbatch = build_sbatch(spec, path.parent, prepare=not (render_only or preflight))
+    if preflight:
+        report = sbatch.preflight(
+            spec.get("command", DEFAULT_COMMAND),
+            task_id=run_spec.get("task_id"),
+            schedule_all_tasks=run_spec.get("schedule_all_tasks", False),
+            main_command_args=run_spec.get("main_command_args"),
+        )
+        print(f"{path}:\n{report.summary()}")
+        errors = report.exceeded_limits(limits) if limits is not None else []
+        for error in errors:
+            print(f"exceeded: {error}")
+        return not len(errors)
+    save_script = run_spec.get("save_script")
+    if save_script is not None and not render_only:
+        save_script = path.parent / save_script
+    else:
+        save_script = None
+    sbatch.run(
+        spec.get("command", DEFAULT_COMMAND),
+        task_id=run_spec.get("task_id"),
+        schedule_all_tasks=run_spec.get("schedule_all_tasks", False),
+        save_script=save_script,
+        main_command_args=run_spec.get("main_command_args"),
+        dry_run=dry_run or render_only,
+        limits=limits,
+    )
+    return True
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="auto-sbatch",
+        description="Submit SLURM jobs from TOML or YAML sweep specs.",
+    )
+    parser.add_argument("specs", nargs="+", help="Sweep spec files to submit.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Prepare the experiments and print the scripts without submitting.",
+    )
+    parser.add_argument(
+        "--render-only",
+        action="store_true",
+        help="Only print the scripts. Skips the experiment handler preparation "
+        "and does not save or submit anything.",
+    )
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Only print the estimated load of each spec (jobs, script size, "
+        "core and GPU-hours, rsync volume) and the exceeded limits. Exits with "
+        "status 1 if a limit is exceeded.",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = make_parser().parse_args(argv)
+    status = 0
+    for spec_path in args.specs:
+        try:
+            if not submit_spec(
+                spec_path, args.dry_run, args.render_only, args.preflight
+            ):
+                status = 1
+        except (OSError, TypeError, ValueError) as e:
+            print(f"auto-sbatch: {spec_path}: {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import base64
+import binascii
+import json
+import shlex
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+ENCODINGS = ("str", "json", "base64")
+BASE64_PREFIX = "b64:"
+
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def check_encoding(encoding: str) -> None:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding {encoding!r}. Use one of {ENCODINGS}.")
+
+
+def get_arg_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    return str(value).replace('"', '\\"')
+
+
+def _b64encode(text: str) -> str:
+    return BASE64_PREFIX + base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def _b64decode(text: str) -> str:
+    if not text.startswith(BASE64_PREFIX):
+        raise ValueError(f"Base64 values must start with {BASE64_PREFIX!r}.")
+    try:
+        decoded = base64.b64decode(text[len(BASE64_PREFIX) :], validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 value {text!r}.") from e
+    return decoded.decode("utf-8")
+
+
+def encode_column(values: Iterable[Any], encoding: str = "str") -> list[str]:
+    """
+    Encodes values to strings, before shell quoting.
+
+    - "str" uses `str()` and escapes double quotes, to be put in double quotes.
+        Values are not typed.
+    - "json" encodes values as JSON. Values must be JSON serializable and are
+        decoded back with their type.
+    - "base64" encodes the JSON representation in base64, with a "b64:" prefix.
+        Encoded values only contain shell-safe characters.
+    """
+    check_encoding(encoding)
+    if encoding == "str":
+        return list(map(get_arg_value, values))
+    encoded = list(map(_json_encoder.encode, values))
+    if encoding == "base64":
+        return list(map(_b64encode, encoded))
+    return encoded
+
+
+def decode_column(values: Sequence[str], encoding: str = "str") -> list[Any]:
+    """
+    Decodes values produced by `encode_column`. With "str", values are decoded as
+    JSON when possible and kept as strings otherwise.
+    """
+    check_encoding(encoding)
+    if encoding == "str":
+        return [_decode_str(value) for value in values]
+    if encoding == "base64":
+        values = list(map(_b64decode, values))
+    # each value is parsed on its own so that malformed values raise
+    return list(map(json.loads, values))
+
+
+def _decode_str(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def encode_value(value: Any, encoding: str = "str") -> str:
+    return encode_column([value], encoding)[0]
+
+
+def decode_value(value: str, encoding: str = "str") -> Any:
+    return decode_column([value], encoding)[0]
+
+
+def quote(encoded: str, encoding: str = "str") -> str:
+    """
+    Quotes an encoded value for the shell. "str" values are put in double quotes
+    (the shell still expands variables), other encodings in single quotes.
+    """
+    if encoding == "str":
+        return f'"{encoded}"'
+    return shlex.quote(encoded)
+
+
+def format_param(key: str, value: Any, encoding: str = "str") -> str:
+    """
+    Formats a script parameter as a single shell word "key=value".
+    """
+    return quote(f"{key}={encode_value(value, encoding)}", encoding)
+
+
+def format_array(values: Iterable[Any], encoding: str = "str") -> str:
+    """
+    Formats a column of values as a shell array.
+    """
+    encoded = encode_column(values, encoding)
+    return "(" + " ".join(quote(value, encoding) for value in encoded) + ")"
+
+
+def decode_args(args: Sequence[str], encoding: str = "json") -> dict[str, Any]:
+    """
+    Decodes "key=value" arguments given to a script started with a typed
+    encoding, e.g. `decode_args(sys.argv[1:])`.
+    """
+    keys, values = [], []
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep:
+            raise ValueError(f"Argument {arg!r} is not of the form key=value.")
+        keys.append(key)
+        values.append(value)
+    return dict(zip(keys, decode_column(values, encoding)))
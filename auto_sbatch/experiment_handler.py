@@ -1,3 +1,5 @@
+import os
+from fnmatch import fnmatchcase
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +18,7 @@ class ExperimentHandler:
         additional_scripts=None,
         setup_experiment=True,
         exclude_in_rsync=None,
+        stable_job_directory=False,
     ):
         self.script_location = Path(script_location)
         self.run_work_directory = Path(run_work_directory)
@@ -24,6 +27,9 @@ class ExperimentHandler:
 
         self._setup_experiment = setup_experiment
         self._exclude_in_rsync = exclude_in_rsync
+        # keep the same job folder when a job is requeued, to resume from its
+        # checkpoints instead of restarting
+        self.stable_job_directory = stable_job_directory
 
         if not (self.work_directory / self.script_location).exists():
             raise ValueError(
@@ -72,7 +78,37 @@ class ExperimentHandler:
             if (self.work_directory / "offline_setup.py").exists():
                 run(["python", str(self.work_directory / "offline_setup")])
 
-    def new_run(self):
+    def excluded_folders(self) -> list[str]:
+        excluded_folders = [".git", ".idea", "__pycache__"]
+        if self._exclude_in_rsync is not None:
+            excluded_folders.extend(self._exclude_in_rsync)
+        return excluded_folders
+
+    def work_directory_size(self) -> int:
+        """
+        Number of bytes copied by rsync when a run starts.
+        """
+        patterns = self.excluded_folders()
+        # rsync copies the folder itself, patterns match paths starting with
+        # its name
+        transfer_root = Path(self.work_directory.resolve().name)
+        size = 0
+        for root, dirs, files in os.walk(self.work_directory):
+            relative_root = transfer_root / Path(root).relative_to(self.work_directory)
+            dirs[:] = [
+                d
+                for d in dirs
+                if not _is_excluded((relative_root / d).as_posix(), True, patterns)
+            ]
+            for file in files:
+                if _is_excluded((relative_root / file).as_posix(), False, patterns):
+                    continue
+                path = Path(root) / file
+                if not path.is_symlink():
+                    size += path.stat().st_size
+        return size
+
+    def prepare_run(self):
         self.source_environment()
         self.load_modules()
         if self.additional_script is not None:
@@ -80,26 +116,42 @@ class ExperimentHandler:
                 run(additional_install)
         self.setup_experiment()
 
-        commands = [
-            "jobId=$SLURM_JOB_ID",
-            f"runWorkdirJob={str(self.run_work_directory)}/$jobId",
-        ]
-
-        excluded_folders = [".git", ".idea", "__pycache__"]
-        if self._exclude_in_rsync is not None:
-            excluded_folders.extend(self._exclude_in_rsync)
+    def new_run(self):
+        self.prepare_run()
+        return self.run_commands()
 
+    def run_commands(self):
         excluded_command = " ".join(
-            [f"--exclude={folder}" for folder in excluded_folders]
+            [f"--exclude={folder}" for folder in self.excluded_folders()]
+        )
+        work_directory_name = self.work_directory.resolve().name
+        rsync_command = (
+            f"rsync -a {str(self.work_directory)} $runWorkdirJob {excluded_command}"
         )
 
-        commands.extend(
-            [
+        if self.stable_job_directory:
+            commands = [
+                "jobId=${SLURM_ARRAY_JOB_ID:+${SLURM_ARRAY_JOB_ID}_"
+                "${SLURM_ARRAY_TASK_ID}}",
+                "jobId=${jobId:-$SLURM_JOB_ID}",
+                f"runWorkdirJob={str(self.run_work_directory)}/$jobId",
+                'mkdir -p "$runWorkdirJob/checkpoints"',
+                f'if [ ! -d "$runWorkdirJob/{work_directory_name}" ]; then',
+                rsync_command,
+                "fi",
+            ]
+        else:
+            commands = [
+                "jobId=$SLURM_JOB_ID",
+                f"runWorkdirJob={str(self.run_work_directory)}/$jobId",
                 'mkdir -p "$runWorkdirJob"',
                 'mkdir "$runWorkdirJob/checkpoints"',
-                f"rsync -a {str(self.work_directory)} $runWorkdirJob "
-                f"{excluded_command}",
-                f'cd "$runWorkdirJob/{self.work_directory.resolve().name}/'
+                rsync_command,
+            ]
+
+        commands.extend(
+            [
+                f'cd "$runWorkdirJob/{work_directory_name}/'
                 f'{str(self.script_location.parent)}"',
                 "module purge",
             ]
@@ -116,3 +168,27 @@ class ExperimentHandler:
     @staticmethod
     def get_main_command_args() -> dict[str, Any]:
         return {"checkpoints_dir": "../../checkpoints/$jobId"}
+
+
+def _is_excluded(path: str, is_dir: bool, patterns: list[str]) -> bool:
+    """
+    Approximates rsync --exclude matching. A pattern without "/" matches the
+    name of the file at any depth, a pattern starting with "/" matches from the
+    transfer root, other patterns match the end of the path. A trailing "/" only
+    matches folders. Unlike rsync, "*" also matches "/".
+    """
+    name = path.rsplit("/", 1)[-1]
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip("/")
+        if pattern.startswith("/"):
+            if fnmatchcase(path, pattern[1:]):
+                return True
+        elif "/" not in pattern:
+            if fnmatchcase(name, pattern):
+                return True
+        elif fnmatchcase(path, pattern) or fnmatchcase(path, "*/" + pattern):
+            return True
+    return False
@@ -13,6 +13,26 @@ class GridSearch:
         self._exclude = exclude or []
         self.n_jobs, self.combinations = self.get_combinations()
 
+    @classmethod
+    def from_combinations(
+        cls, combinations: Mapping[str, Sequence[Any]]
+    ) -> "GridSearch":
+        """
+        Creates a grid-search from already computed combinations, one column
+        of values per key, as in `GridSearch.combinations`.
+        """
+        lengths = {len(values) for values in combinations.values()}
+        if len(lengths) > 1:
+            raise ValueError("All combination columns must have the same length.")
+        grid_search = cls.__new__(cls)
+        grid_search._values = combinations
+        grid_search._exclude = []
+        grid_search.n_jobs = lengths.pop() if len(lengths) else 0
+        grid_search.combinations = {
+            key: list(values) for key, values in combinations.items()
+        }
+        return grid_search
+
     def get_combinations(self) -> tuple[int, dict[str, list[Any]]]:
         keys, values = tuple(zip(*self._values.items()))
         all_combinations = list(product(*values))
@@ -28,7 +48,7 @@ class GridSearch:
         return njobs, new_values
 
     def job_params(self, job_id: int) -> dict[str, Any]:
-        if 0 < job_id or job_id >= self.n_jobs:
+        if job_id < 0 or job_id >= self.n_jobs:
             raise ValueError(f"job_id should be >= 0 and < {self.n_jobs}")
         return {key: val[job_id] for key, val in self.combinations.items()}
 
@@ -0,0 +1,280 @@
+import re
+from collections.abc import Sequence
+from math import inf, isinf
+from typing import Any
+
+
+class PreflightError(ValueError):
+    pass
+
+
+def parse_slurm_time(value: Any) -> float:
+    """
+    Converts a SLURM time limit to seconds.
+    Accepted formats are "minutes", "minutes:seconds", "hours:minutes:seconds",
+    "days-hours", "days-hours:minutes" and "days-hours:minutes:seconds".
+    "UNLIMITED" and "infinite" return `inf`.
+    """
+    value = str(value).strip()
+    if value.lower() in ("unlimited", "infinite"):
+        return inf
+    if re.fullmatch(r"(\d+-)?\d+(:\d+){0,2}", value) is None:
+        raise ValueError(f"Invalid SLURM time {value!r}.")
+    days = 0
+    if "-" in value:
+        days_str, value = value.split("-", 1)
+        days = int(days_str)
+        parts = [int(p) for p in value.split(":")]
+        parts += [0] * (3 - len(parts))
+        hours, minutes, seconds = parts
+    else:
+        parts = [int(p) for p in value.split(":")]
+        if len(parts) == 1:
+            hours, minutes, seconds = 0, parts[0], 0
+        elif len(parts) == 2:
+            hours, minutes, seconds = 0, parts[0], parts[1]
+        else:
+            hours, minutes, seconds = parts
+    return float(((days * 24 + hours) * 60 + minutes) * 60 + seconds)
+
+
+def parse_array(value: Any) -> tuple[list[tuple[int, int, int]], int | None]:
+    """
+    Parses a SLURM --array value such as "0-99%10" or "1,3,5-11:2".
+
+    Returns:
+        the list of (start, stop, step) ranges (stop is inclusive) and the
+        maximum number of simultaneously running tasks (or None).
+    """
+    value = str(value).strip()
+    throttle = None
+    if "%" in value:
+        value, throttle_str = value.split("%", 1)
+        throttle = int(throttle_str)
+    ranges = []
+    for item in value.split(","):
+        match = re.fullmatch(r"(\d+)(?:-(\d+)(?::(\d+))?)?", item.strip())
+        if match is None:
+            raise ValueError(f"Invalid SLURM array {value!r}.")
+        start = int(match.group(1))
+        stop = int(match.group(2)) if match.group(2) is not None else start
+        step = int(match.group(3)) if match.group(3) is not None else 1
+        ranges.append((start, stop, step))
+    return ranges, throttle
+
+
+def array_task_ids(ranges: Sequence[tuple[int, int, int]]) -> list[int]:
+    task_ids: list[int] = []
+    for start, stop, step in ranges:
+        task_ids.extend(range(start, stop + 1, step))
+    return task_ids
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def _format_hours(hours: float) -> str:
+    if isinf(hours):
+        return "unlimited (--time=UNLIMITED)"
+    return f"{hours:.1f}"
+
+
+class PreflightLimits:
+    def __init__(
+        self,
+        max_jobs: int | None = None,
+        max_array_size: int | None = None,
+        max_script_bytes: int | None = None,
+        max_core_hours: float | None = None,
+        max_gpu_hours: float | None = None,
+        max_rsync_bytes: int | None = None,
+    ):
+        """
+        Thresholds over which a submission is refused. None disables a check.
+
+        Args:
+            max_jobs: maximum number of jobs scheduled by slurmctld (array tasks
+                count as separate jobs).
+            max_array_size: SLURM MaxArraySize. The highest array index must be
+                lower than this value.
+            max_script_bytes: maximum size of one rendered script.
+            max_core_hours: maximum number of requested core-hours.
+            max_gpu_hours: maximum number of requested GPU-hours.
+            max_rsync_bytes: maximum volume copied by the experiment handler
+                over all jobs.
+        """
+        self.max_jobs = max_jobs
+        self.max_array_size = max_array_size
+        self.max_script_bytes = max_script_bytes
+        self.max_core_hours = max_core_hours
+        self.max_gpu_hours = max_gpu_hours
+        self.max_rsync_bytes = max_rsync_bytes
+
+
+class PreflightReport:
+    def __init__(
+        self,
+        n_tasks: int,
+        n_submissions: int,
+        n_jobs: int,
+        array_ranges: list[tuple[int, int, int]] | None,
+        array_throttle: int | None,
+        script_bytes: list[int],
+        time_limit: float | None,
+        cores_per_job: int,
+        gpus_per_job: int,
+        rsync_bytes_per_job: int | None,
+    ):
+        """
+        Estimation of the load of a submission.
+
+        Args:
+            n_tasks: number of grid-search tasks.
+            n_submissions: number of calls to sbatch.
+            n_jobs: number of jobs scheduled by slurmctld.
+            array_ranges: ranges of the SLURM array, if any.
+            array_throttle: maximum number of simultaneous array tasks.
+            script_bytes: size of each rendered script.
+            time_limit: requested time limit per job in seconds, `inf` for
+                --time=UNLIMITED.
+            cores_per_job: requested cores per job.
+            gpus_per_job: requested GPUs per job.
+            rsync_bytes_per_job: volume copied by the experiment handler in
+                each job.
+        """
+        self.n_tasks = n_tasks
+        self.n_submissions = n_submissions
+        self.n_jobs = n_jobs
+        self.array_ranges = array_ranges
+        self.array_throttle = array_throttle
+        self.script_bytes = script_bytes
+        self.time_limit = time_limit
+        self.cores_per_job = cores_per_job
+        self.gpus_per_job = gpus_per_job
+        self.rsync_bytes_per_job = rsync_bytes_per_job
+
+    @property
+    def max_script_bytes(self) -> int:
+        return max(self.script_bytes, default=0)
+
+    @property
+    def total_script_bytes(self) -> int:
+        return sum(self.script_bytes)
+
+    @property
+    def max_array_index(self) -> int | None:
+        if not self.array_ranges:
+            return None
+        return max(array_task_ids(self.array_ranges))
+
+    def _resource_hours(self, per_job: int) -> float | None:
+        if self.time_limit is None:
+            return None
+        if per_job == 0 or self.n_jobs == 0:
+            # avoids 0 * inf with an unlimited time
+            return 0.0
+        return self.n_jobs * per_job * self.time_limit / 3600
+
+    @property
+    def core_hours(self) -> float | None:
+        return self._resource_hours(self.cores_per_job)
+
+    @property
+    def gpu_hours(self) -> float | None:
+        return self._resource_hours(self.gpus_per_job)
+
+    @property
+    def rsync_bytes(self) -> int | None:
+        if self.rsync_bytes_per_job is None:
+            return None
+        return self.n_jobs * self.rsync_bytes_per_job
+
+    def summary(self) -> str:
+        lines = [
+            f"tasks: {self.n_tasks}",
+            f"sbatch submissions: {self.n_submissions}",
+            f"scheduled jobs: {self.n_jobs}",
+        ]
+        if self.array_ranges is not None:
+            array = ",".join(
+                f"{start}-{stop}" + (f":{step}" if step != 1 else "")
+                for start, stop, step in self.array_ranges
+            )
+            if self.array_throttle is not None:
+                array += f"%{self.array_throttle}"
+            lines.append(f"array: {array}")
+        lines.append(
+            f"script size: {_format_bytes(self.max_script_bytes)} max, "
+            f"{_format_bytes(self.total_script_bytes)} total"
+        )
+        if self.core_hours is not None and self.gpu_hours is not None:
+            lines.append(f"core-hours: {_format_hours(self.core_hours)}")
+            lines.append(f"GPU-hours: {_format_hours(self.gpu_hours)}")
+        else:
+            lines.append("core-hours: unknown (no --time)")
+        if self.rsync_bytes is not None:
+            lines.append(f"rsync volume: {_format_bytes(self.rsync_bytes)}")
+        return "\n".join(lines)
+
+    def exceeded_limits(self, limits: PreflightLimits) -> list[str]:
+        errors = []
+        if limits.max_jobs is not None and self.n_jobs > limits.max_jobs:
+            errors.append(f"{self.n_jobs} jobs > max_jobs={limits.max_jobs}")
+        max_array_index = self.max_array_index
+        if (
+            limits.max_array_size is not None
+            and max_array_index is not None
+            and max_array_index >= limits.max_array_size
+        ):
+            errors.append(
+                f"array index {max_array_index} >= "
+                f"max_array_size={limits.max_array_size}"
+            )
+        if (
+            limits.max_script_bytes is not None
+            and self.max_script_bytes > limits.max_script_bytes
+        ):
+            errors.append(
+                f"script of {self.max_script_bytes} bytes > "
+                f"max_script_bytes={limits.max_script_bytes}"
+            )
+        if (
+            limits.max_core_hours is not None
+            and self.core_hours is not None
+            and self.core_hours > limits.max_core_hours
+        ):
+            errors.append(
+                f"{_format_hours(self.core_hours)} core-hours > "
+                f"max_core_hours={limits.max_core_hours}"
+            )
+        if (
+            limits.max_gpu_hours is not None
+            and self.gpu_hours is not None
+            and self.gpu_hours > limits.max_gpu_hours
+        ):
+            errors.append(
+                f"{_format_hours(self.gpu_hours)} GPU-hours > "
+                f"max_gpu_hours={limits.max_gpu_hours}"
+            )
+        if (
+            limits.max_rsync_bytes is not None
+            and self.rsync_bytes is not None
+            and self.rsync_bytes > limits.max_rsync_bytes
+        ):
+            errors.append(
+                f"rsync of {self.rsync_bytes} bytes > "
+                f"max_rsync_bytes={limits.max_rsync_bytes}"
+            )
+        return errors
+
+    def check(self, limits: PreflightLimits) -> None:
+        errors = self.exceeded_limits(limits)
+        if len(errors):
+            raise PreflightError(
+                "Refusing to submit: " + "; ".join(errors) + "\n" + self.summary()
+            )
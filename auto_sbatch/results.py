@@ -0,0 +1,203 @@
+import json
+import os
+import shlex
+from collections.abc import Mapping, Sequence
+from os import PathLike
+from pathlib import Path
+from typing import Any
+
+from auto_sbatch.grid_search import GridSearch
+
+METRICS_FILE_ENV = "AUTO_SBATCH_METRICS_FILE"
+GRID_FILE = "grid.json"
+
+
+def task_record_commands(
+    results_dir: str | PathLike, task_id: int | None = None
+) -> tuple[list[str], list[str]]:
+    """
+    Shell commands to put around the main command of a script to record the
+    task status, timings and metrics in `results_dir`.
+
+    Args:
+        results_dir: folder of the task records.
+        task_id: grid index of the task. If None, $taskId is used.
+
+    Returns:
+        the commands to add before and after the main command.
+    """
+    task = "${taskId}" if task_id is None else str(task_id)
+    prefix = shlex.quote(str(Path(results_dir).absolute())) + f"/task_{task}"
+    record = '{"task_id": %s, "job_id": "%s", "status": %s, "start": %s, "end": %s}\\n'
+    pre_commands = [
+        f"export {METRICS_FILE_ENV}={prefix}.metrics.json",
+        "taskStart=$(date +%s.%N)",
+    ]
+    post_commands = [
+        "taskStatus=$?",
+        "taskEnd=$(date +%s.%N)",
+        f'printf \'{record}\' {task} "$SLURM_JOB_ID" "$taskStatus" '
+        f'"$taskStart" "$taskEnd" > {prefix}.json',
+        # keep the exit status of the task as the status of the script
+        '(exit "$taskStatus")',
+    ]
+    return pre_commands, post_commands
+
+
+def write_grid(results_dir: str | PathLike, grid_search: GridSearch | None) -> None:
+    """
+    Saves the grid-search combinations next to the task records so that
+    records can be joined with their parameters.
+    """
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    grid: dict[str, Any] = {"n_tasks": 1, "params": {}}
+    if grid_search is not None:
+        grid = {"n_tasks": grid_search.n_jobs, "params": grid_search.combinations}
+    with open(results_dir / GRID_FILE, "w") as f:
+        json.dump(grid, f, default=str)
+
+
+def log_metrics(**metrics: Any) -> None:
+    """
+    Records metrics of the current task. To call from the python script started
+    by a job with `results_dir` set. Successive calls update the same record.
+    Does nothing when the script is not started by auto-sbatch.
+    """
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path is None:
+        return
+    current: dict[str, Any] = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            current = json.load(f)
+    current.update(metrics)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(current, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: Path) -> dict[str, Any] | None:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _read_task(record_path: Path) -> tuple[dict[str, Any], dict[str, Any]] | None:
+    record = _read_json(record_path)
+    if record is None:
+        return None
+    metrics_path = record_path.with_name(record_path.stem + ".metrics.json")
+    return record, _read_json(metrics_path) or {}
+
+
+def collect_results(
+    results_dir: str | PathLike, workers: int | None = None
+) -> dict[str, list[Any]]:
+    """
+    Merges the task records of `results_dir` into columns keyed by grid index.
+
+    Args:
+        results_dir: the `results_dir` given to SBatch.
+        workers: number of threads reading the records.
+
+    Returns:
+        the columns "task_id", "job_id", "status", "start", "end" and
+        "duration", one "params/<name>" column per grid-search parameter and
+        one "metrics/<name>" column per logged metric. Missing values are None.
+    """
+    results_dir = Path(results_dir)
+    grid = _read_json(results_dir / GRID_FILE) or {"params": {}}
+    record_paths = [
+        path
+        for path in results_dir.glob("task_*.json")
+        if not path.name.endswith(".metrics.json")
+    ]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(workers) as executor:
+        tasks = list(executor.map(_read_task, record_paths))
+
+    # a task started several times writes its record again, keep the latest one
+    latest: dict[int, tuple[dict[str, Any], dict[str, Any]]] = {}
+    for task in tasks:
+        if task is None:
+            continue
+        task_id = int(task[0]["task_id"])
+        if task_id not in latest or task[0]["end"] >= latest[task_id][0]["end"]:
+            latest[task_id] = task
+
+    task_ids = sorted(latest.keys())
+    columns: dict[str, list[Any]] = {
+        "task_id": task_ids,
+        "job_id": [latest[k][0]["job_id"] for k in task_ids],
+        "status": [latest[k][0]["status"] for k in task_ids],
+        "start": [latest[k][0]["start"] for k in task_ids],
+        "end": [latest[k][0]["end"] for k in task_ids],
+        "duration": [latest[k][0]["end"] - latest[k][0]["start"] for k in task_ids],
+    }
+    for key, values in grid["params"].items():
+        columns[f"params/{key}"] = [
+            values[k] if k < len(values) else None for k in task_ids
+        ]
+    metric_names = {name: None for k in task_ids for name in latest[k][1].keys()}
+    for name in metric_names:
+        columns[f"metrics/{name}"] = [latest[k][1].get(name) for k in task_ids]
+    return columns
+
+
+def _to_array(values: Sequence[Any]):
+    import numpy as np
+
+    is_numeric = all(
+        value is None
+        or (isinstance(value, (int, float)) and not isinstance(value, bool))
+        for value in values
+    )
+    if is_numeric and any(value is None for value in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = np.empty(len(values), dtype=object)
+        array[:] = list(values)
+    return array
+
+
+def save_results(columns: Mapping[str, Sequence[Any]], path: str | PathLike) -> None:
+    """
+    Saves columns to a ".npz" (requires numpy) or ".parquet"/".arrow"/".feather"
+    (requires pyarrow) file.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npz":
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ValueError("numpy is required to save .npz files.") from e
+
+        np.savez(path, **{key: _to_array(values) for key, values in columns.items()})
+    elif suffix in (".parquet", ".arrow", ".feather"):
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ValueError(f"pyarrow is required to save {suffix} files.") from e
+
+        table = pa.table({key: list(values) for key, values in columns.items()})
+        if suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, path)
+    else:
+        raise ValueError(
+            f"Unknown results format {suffix!r}. Use .npz, .parquet, .arrow "
+            f"or .feather."
+        )
@@ -1,3 +1,4 @@
+import warnings
 from collections.abc import Iterable, Mapping
 from os import PathLike
 from pathlib import Path
@@ -5,10 +6,28 @@ from subprocess import PIPE, Popen
 from typing import Any, List
 
 from auto_sbatch import ExperimentHandler
+from auto_sbatch.encoding import get_arg_value  # noqa: F401
+from auto_sbatch.encoding import (
+    check_encoding,
+    encode_value,
+    format_array,
+    format_param,
+    quote,
+)
 from auto_sbatch.grid_search import GridSearch
+from auto_sbatch.preflight import (
+    PreflightLimits,
+    PreflightReport,
+    array_task_ids,
+    parse_array,
+    parse_slurm_time,
+)
 from auto_sbatch.processes import Command
+from auto_sbatch.results import task_record_commands, write_grid
 from auto_sbatch.slurm_script import SlurmScriptParser
 
+REQUEUE_SIGNAL = "USR1"
+
 
 class SBatch:
     def __init__(
@@ -19,6 +38,9 @@ class SBatch:
         grid_search: GridSearch | None = None,
         script_name: str | None = None,
         experiment_handler: ExperimentHandler | None = None,
+        results_dir: str | PathLike | None = None,
+        requeue_signal_time: int | None = None,
+        param_encoding: str = "str",
     ):
         self._slurm_params = dict(slurm_params or {})
         self._script_params = dict(script_params or {})
@@ -26,28 +48,73 @@ class SBatch:
         self._post_commands: List[Command] = []
         self._n_job_seq = 1
         self._main_command_args: dict[str, Any] = {}
+        self._experiment_handler: ExperimentHandler | None = None
 
         self._grid_search = grid_search
         self._script_name = script_name
+        self._results_dir = results_dir
+        check_encoding(param_encoding)
+        self._param_encoding = param_encoding
+
+        # seconds before the time limit at which the job is signaled and
+        # requeued
+        self._requeue_signal_time = requeue_signal_time
+        if requeue_signal_time is not None:
+            if "--signal" in self._slurm_params:
+                raise ValueError(
+                    "Cannot set --signal when requeue_signal_time is used, "
+                    f"it is set to B:{REQUEUE_SIGNAL}@{requeue_signal_time}."
+                )
+            self._slurm_params["--signal"] = f"B:{REQUEUE_SIGNAL}@{requeue_signal_time}"
 
         if experiment_handler is not None:
             self.configure_from_experiment_handler(experiment_handler)
 
         self.set_grid_search()
 
-    def configure_from_experiment_handler(self, handler: ExperimentHandler):
-        self.add_commands(handler.new_run())
+    def configure_from_experiment_handler(
+        self, handler: ExperimentHandler, prepare: bool = True
+    ):
+        if self._requeue_signal_time is not None and not handler.stable_job_directory:
+            warnings.warn(
+                "requeue_signal_time is set: enabling stable_job_directory on the "
+                "experiment handler so that requeued jobs resume from their "
+                "checkpoints.",
+                stacklevel=2,
+            )
+            handler.stable_job_directory = True
+        if prepare:
+            self.add_commands(handler.new_run())
+        else:
+            self.add_commands(handler.run_commands())
         self._main_command_args.update(handler.get_main_command_args())
+        self._experiment_handler = handler
         self.set_script_name(handler.script_location.name)
 
     def set_script_name(self, script_name: str):
         self._script_name = script_name
 
     @classmethod
-    def from_slurm_script(cls, slurm_script: str, main_command: str) -> "SBatch":
-        parser = SlurmScriptParser(slurm_script, main_command)
+    def from_slurm_script(
+        cls, slurm_script: str, main_command: str, param_encoding: str = "str"
+    ) -> "SBatch":
+        parser = SlurmScriptParser(slurm_script, main_command, param_encoding)
         parser.parse()
-        sbatch = cls(parser.slurm_params, parser.params, script_name=parser.script_name)
+        slurm_params = dict(parser.slurm_params)
+        if parser.requeue_signal_time is not None:
+            # regenerated from requeue_signal_time
+            del slurm_params["--signal"]
+        grid_search = None
+        if len(parser.grid_search_params):
+            grid_search = GridSearch.from_combinations(parser.grid_search_params)
+        sbatch = cls(
+            slurm_params,
+            parser.params,
+            grid_search=grid_search,
+            script_name=parser.script_name,
+            requeue_signal_time=parser.requeue_signal_time,
+            param_encoding=param_encoding,
+        )
         sbatch.add_commands(parser.commands)
         sbatch.add_commands(parser.post_commands, post=True)
         return sbatch
@@ -76,11 +143,31 @@ class SBatch:
 
     def get_num_gpus(self) -> int:
         if "--gres" in self._slurm_params:
+            # gpu:N or gpu:type:N
             s = self._slurm_params["--gres"].split(":")
             if len(s) > 1:
-                return int(s[1])
+                return int(s[-1])
         return 0
 
+    def _get_int_param(self, *keys: str) -> int | None:
+        for key in keys:
+            if key in self._slurm_params:
+                # node counts can be given as a "min-max" range
+                return int(str(self._slurm_params[key]).split("-")[0])
+        return None
+
+    def get_num_nodes(self) -> int:
+        return self._get_int_param("-N", "--nodes") or 1
+
+    def get_num_cores(self) -> int:
+        cpus_per_task = self._get_int_param("-c", "--cpus-per-task") or 1
+        n_tasks = self._get_int_param("-n", "--ntasks")
+        if n_tasks is None:
+            n_tasks = self.get_num_nodes() * (
+                self._get_int_param("--ntasks-per-node") or 1
+            )
+        return n_tasks * cpus_per_task
+
     def _is_grid_search_key(self, key: str) -> bool:
         if self._grid_search is None:
             return False
@@ -96,8 +183,7 @@ class SBatch:
             grid_search_params = self._grid_search.combinations
         for key, value in self._script_params.items():
             if key not in grid_search_params:
-                escaped_value = get_arg_value(value)
-                s = f'"{key}={escaped_value}"'
+                s = format_param(key, value, self._param_encoding)
                 params["params"] += f" {s}"
                 params["all"] += f" {s}"
         for key in grid_search_params.keys():
@@ -129,6 +215,18 @@ class SBatch:
         task_id: int | None = None,
         main_command_args: Mapping[str, str] | None = None,
     ) -> str:
+        if (
+            self._requeue_signal_time is not None
+            and task_id is None
+            and self._n_job_seq > 1
+            and "--array" not in self._slurm_params
+        ):
+            # a requeued job would start again from the first task, with the
+            # same checkpoint folder for all tasks
+            raise ValueError(
+                "requeue_signal_time cannot be used with several tasks run "
+                "sequentially in one job. Use --array or schedule_all_tasks=True."
+            )
         run_command = Command(run_command)
         script_name = self._script_name
 
@@ -143,22 +241,26 @@ class SBatch:
         for command in self._commands:
             slurm_script += f"\n{command.get()}"
 
+        if self._requeue_signal_time is not None:
+            slurm_script += f"\n{get_requeue_handler()}"
+
         grid_search_params = {}
         if self._grid_search is not None:
             grid_search_params = self._grid_search.combinations
         for key, param_values in grid_search_params.items():
             if "--array" not in self._slurm_params and task_id is not None:
                 key_var = key.replace(".", "_").replace("/", "_")
-                formatted_value = get_arg_value(param_values[task_id])
+                formatted_value = encode_value(
+                    param_values[task_id], self._param_encoding
+                )
+                if self._param_encoding != "str":
+                    formatted_value = quote(formatted_value, self._param_encoding)
                 slurm_script += f"\n{key_var}_param={formatted_value}"
             else:
                 key_var = key.replace(".", "_").replace("/", "_")
                 slurm_script += (
-                    "\n"
-                    + key_var
-                    + '_param=("'
-                    + '" "'.join(map(get_arg_value, param_values))
-                    + '")'
+                    f"\n{key_var}_param="
+                    f"{format_array(param_values, self._param_encoding)}"
                 )
 
         if "--array" in self._slurm_params:
@@ -181,8 +283,27 @@ class SBatch:
         run_command_args.update(self._main_command_args)
         run_command_args.update(main_command_args or {})
 
-        run_command.format(**run_command_args)
-        slurm_script += f"\n{run_command.get()}"
+        try:
+            run_command.format(**run_command_args)
+        except KeyError as e:
+            raise ValueError(
+                f"Unknown placeholder {{{e.args[0]}}} in the run command."
+            ) from e
+        record_pre_commands: list[str] = []
+        record_post_commands: list[str] = []
+        if self._results_dir is not None:
+            record_pre_commands, record_post_commands = task_record_commands(
+                self._results_dir,
+                task_id if "--array" not in self._slurm_params else None,
+            )
+        for record_command in record_pre_commands:
+            slurm_script += f"\n{record_command}"
+        if self._requeue_signal_time is not None:
+            slurm_script += f"\n{run_in_background(run_command.get())}"
+        else:
+            slurm_script += f"\n{run_command.get()}"
+        for record_command in record_post_commands:
+            slurm_script += f"\n{record_command}"
 
         if (
             self._n_job_seq > 1
@@ -196,21 +317,81 @@ class SBatch:
 
         return slurm_script
 
-    def run(
+    def make_slurm_scripts(
         self,
         run_command: str | Command,
         task_id: int | None = None,
         schedule_all_tasks: bool = False,
-        save_script: str | PathLike | None = None,
         main_command_args: Mapping[str, str] | None = None,
-    ):
+    ) -> list[tuple[int | None, str]]:
         task_ids = [task_id]
         if schedule_all_tasks and "--array" not in self._slurm_params:
             task_ids = list(range(self._n_job_seq))
-        for task_id in task_ids:
-            slurm_script = self.make_slurm_script(
-                run_command, task_id, main_command_args
+        return [
+            (task_id, self.make_slurm_script(run_command, task_id, main_command_args))
+            for task_id in task_ids
+        ]
+
+    def preflight(
+        self,
+        run_command: str | Command,
+        task_id: int | None = None,
+        schedule_all_tasks: bool = False,
+        main_command_args: Mapping[str, str] | None = None,
+        slurm_scripts: list[tuple[int | None, str]] | None = None,
+    ) -> PreflightReport:
+        if slurm_scripts is None:
+            slurm_scripts = self.make_slurm_scripts(
+                run_command, task_id, schedule_all_tasks, main_command_args
             )
+        n_submissions = len(slurm_scripts)
+        array_ranges, array_throttle = None, None
+        n_jobs = n_submissions
+        if "--array" in self._slurm_params:
+            array_ranges, array_throttle = parse_array(self._slurm_params["--array"])
+            n_jobs = n_submissions * len(array_task_ids(array_ranges))
+        time_limit = None
+        if "--time" in self._slurm_params:
+            time_limit = parse_slurm_time(self._slurm_params["--time"])
+        elif "-t" in self._slurm_params:
+            time_limit = parse_slurm_time(self._slurm_params["-t"])
+        rsync_bytes_per_job = None
+        if self._experiment_handler is not None:
+            rsync_bytes_per_job = self._experiment_handler.work_directory_size()
+        return PreflightReport(
+            n_tasks=self._n_job_seq,
+            n_submissions=n_submissions,
+            n_jobs=n_jobs,
+            array_ranges=array_ranges,
+            array_throttle=array_throttle,
+            script_bytes=[len(script.encode("utf-8")) for _, script in slurm_scripts],
+            time_limit=time_limit,
+            cores_per_job=self.get_num_cores(),
+            gpus_per_job=self.get_num_gpus() * self.get_num_nodes(),
+            rsync_bytes_per_job=rsync_bytes_per_job,
+        )
+
+    def run(
+        self,
+        run_command: str | Command,
+        task_id: int | None = None,
+        schedule_all_tasks: bool = False,
+        save_script: str | PathLike | None = None,
+        main_command_args: Mapping[str, str] | None = None,
+        dry_run: bool = False,
+        limits: PreflightLimits | None = None,
+    ):
+        slurm_scripts = self.make_slurm_scripts(
+            run_command, task_id, schedule_all_tasks, main_command_args
+        )
+        if limits is not None:
+            report = self.preflight(run_command, slurm_scripts=slurm_scripts)
+            report.check(limits)
+        # a dry run must not replace the grid of a sweep already running in
+        # the same folder
+        if self._results_dir is not None and not dry_run:
+            write_grid(self._results_dir, self._grid_search)
+        for task_id, slurm_script in slurm_scripts:
             if save_script is not None:
                 path_location = Path(save_script)
                 if task_id is not None:
@@ -219,13 +400,44 @@ class SBatch:
                     )
                 with open(path_location, "w") as f:
                     f.write(slurm_script)
-            run(slurm_script)
-
-
-def get_arg_value(value: Any) -> str:
-    if value is None:
-        return "null"
-    return str(value).replace('"', '\\"')
+            if dry_run:
+                print(slurm_script)
+            else:
+                run(slurm_script)
+
+
+def get_requeue_handler() -> str:
+    """
+    Shell function forwarding REQUEUE_SIGNAL to the main process and requeuing
+    the job once the main process has stopped.
+    """
+    return "\n".join(
+        [
+            "requeueHandler() {",
+            f'    echo "Received {REQUEUE_SIGNAL}, requeuing the job"',
+            f'    kill -{REQUEUE_SIGNAL} "$mainPid" 2>/dev/null',
+            f'    pkill -{REQUEUE_SIGNAL} -P "$mainPid" 2>/dev/null',
+            '    wait "$mainPid"',
+            '    if [ -n "$SLURM_ARRAY_JOB_ID" ]; then',
+            '        scontrol requeue "${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}"',
+            "    else",
+            '        scontrol requeue "$SLURM_JOB_ID"',
+            "    fi",
+            "    exit 0",
+            "}",
+            f"trap requeueHandler {REQUEUE_SIGNAL}",
+        ]
+    )
+
+
+def run_in_background(command: str) -> str:
+    """
+    Starts the command in background so that the trap of the batch shell runs as
+    soon as the signal is received.
+    """
+    if "\n" in command:
+        command = f"(\n{command}\n)"
+    return f'{command} &\nmainPid=$!\nwait "$mainPid"'
 
 
 def run(slurm_script: str):
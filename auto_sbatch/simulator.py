@@ -0,0 +1,484 @@
+import heapq
+import statistics
+from bisect import bisect_left, insort
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from itertools import count
+from math import ceil, inf
+from operator import attrgetter
+
+from auto_sbatch.preflight import array_task_ids, parse_array, parse_slurm_time
+from auto_sbatch.processes import Command
+from auto_sbatch.sbatch import SBatch
+from auto_sbatch.slurm_script import SlurmScriptParser
+
+Runtime = float | Callable[[int | None], float] | None
+
+
+class Node:
+    def __init__(
+        self,
+        name: str,
+        cpus: int,
+        gpus: int = 0,
+        partitions: Sequence[str] = ("default",),
+    ):
+        self.name = name
+        self.cpus = cpus
+        self.gpus = gpus
+        self.partitions = tuple(partitions)
+
+
+class Cluster:
+    def __init__(
+        self,
+        nodes: Iterable[Node],
+        max_array_size: int = 1001,
+        default_partition: str | None = None,
+        default_time_limit: float = 3600.0,
+    ):
+        """
+        Args:
+            nodes: nodes of the cluster.
+            max_array_size: SLURM MaxArraySize. Arrays with an index greater or
+                equal are rejected at submission.
+            default_partition: partition of jobs without --partition. Defaults
+                to the first partition of the first node.
+            default_time_limit: time limit in seconds of jobs without --time.
+        """
+        self.nodes = list(nodes)
+        if not len(self.nodes):
+            raise ValueError("A cluster needs at least one node.")
+        if len({node.name for node in self.nodes}) != len(self.nodes):
+            raise ValueError("Node names must be unique.")
+        self.max_array_size = max_array_size
+        self.default_partition = default_partition or self.nodes[0].partitions[0]
+        self.default_time_limit = default_time_limit
+
+    @classmethod
+    def uniform(
+        cls,
+        n_nodes: int,
+        cpus: int,
+        gpus: int = 0,
+        partition: str = "default",
+        **kwargs,
+    ) -> "Cluster":
+        nodes = [Node(f"node{k}", cpus, gpus, (partition,)) for k in range(n_nodes)]
+        return cls(nodes, **kwargs)
+
+    @property
+    def total_cpus(self) -> int:
+        return sum(node.cpus for node in self.nodes)
+
+    @property
+    def total_gpus(self) -> int:
+        return sum(node.gpus for node in self.nodes)
+
+
+class SimulatedJob:
+    def __init__(
+        self,
+        job_id: int,
+        array_task_id: int | None,
+        submit_time: float,
+        start_time: float,
+        end_time: float,
+        time_limit: float,
+        node_names: list[str],
+        cpus_per_node: int,
+        gpus_per_node: int,
+    ):
+        self.job_id = job_id
+        self.array_task_id = array_task_id
+        self.submit_time = submit_time
+        self.start_time = start_time
+        self.end_time = end_time
+        self.time_limit = time_limit
+        self.node_names = node_names
+        self.cpus_per_node = cpus_per_node
+        self.gpus_per_node = gpus_per_node
+        # the scheduler only knows the time limit, not the actual runtime
+        self.expected_end_time = start_time + time_limit
+
+    @property
+    def wait_time(self) -> float:
+        return self.start_time - self.submit_time
+
+    @property
+    def run_time(self) -> float:
+        return self.end_time - self.start_time
+
+
+class _PendingJob:
+    """
+    A submitted job, or the tasks of an array that have not started yet.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        task_ids: Sequence[int | None],
+        throttle: int | None,
+        submit_time: float,
+        time_limit: float,
+        runtime: Runtime,
+        node_names: Sequence[str],
+        n_nodes: int,
+        cpus_per_node: int,
+        gpus_per_node: int,
+    ):
+        self.job_id = job_id
+        self.initial_task_ids = list(task_ids)
+        self.task_ids: deque[int | None] = deque(task_ids)
+        self.throttle = throttle
+        self.submit_time = submit_time
+        self.time_limit = time_limit
+        self.runtime = runtime
+        # nodes in the partitions of the job
+        self.node_names = list(node_names)
+        self.n_nodes = n_nodes
+        self.cpus_per_node = cpus_per_node
+        self.gpus_per_node = gpus_per_node
+        self.n_running = 0
+
+    def reset(self):
+        self.task_ids = deque(self.initial_task_ids)
+        self.n_running = 0
+
+    def get_runtime(self, task_id: int | None) -> float:
+        if self.runtime is None:
+            return self.time_limit
+        if callable(self.runtime):
+            runtime = self.runtime(task_id)
+        else:
+            runtime = self.runtime
+        # jobs are killed at their time limit
+        return min(float(runtime), self.time_limit)
+
+
+class SimulationReport:
+    def __init__(self, jobs: list[SimulatedJob], cluster: Cluster):
+        self.jobs = jobs
+        self.n_jobs = len(jobs)
+        self.makespan = 0.0
+        self.cpu_utilization = 0.0
+        self.gpu_utilization: float | None = None
+        self.mean_wait = 0.0
+        self.median_wait = 0.0
+        self.max_wait = 0.0
+        if not len(jobs):
+            return
+
+        self.makespan = max(job.end_time for job in jobs) - min(
+            job.submit_time for job in jobs
+        )
+        waits = [job.wait_time for job in jobs]
+        self.mean_wait = statistics.fmean(waits)
+        self.median_wait = statistics.median(waits)
+        self.max_wait = max(waits)
+        if self.makespan > 0:
+            cpu_time = sum(
+                job.cpus_per_node * len(job.node_names) * job.run_time for job in jobs
+            )
+            self.cpu_utilization = cpu_time / (cluster.total_cpus * self.makespan)
+            if cluster.total_gpus > 0:
+                gpu_time = sum(
+                    job.gpus_per_node * len(job.node_names) * job.run_time
+                    for job in jobs
+                )
+                self.gpu_utilization = gpu_time / (cluster.total_gpus * self.makespan)
+
+    def summary(self) -> str:
+        lines = [
+            f"jobs: {self.n_jobs}",
+            f"makespan: {self.makespan / 3600:.2f} h",
+            f"CPU utilization: {100 * self.cpu_utilization:.1f}%",
+        ]
+        if self.gpu_utilization is not None:
+            lines.append(f"GPU utilization: {100 * self.gpu_utilization:.1f}%")
+        lines.append(
+            f"queue wait: {self.mean_wait / 3600:.2f} h mean, "
+            f"{self.median_wait / 3600:.2f} h median, "
+            f"{self.max_wait / 3600:.2f} h max"
+        )
+        return "\n".join(lines)
+
+
+class Simulator:
+    def __init__(self, cluster: Cluster, backfill: bool = True):
+        """
+        Discrete-event simulation of the SLURM scheduler on a cluster.
+
+        Jobs are scheduled in submission order. When a job cannot start, it gets
+        a reservation at the earliest time it fits, computed from the time
+        limits of running jobs. With `backfill`, later jobs start before it if
+        they do not delay this reservation (EASY backfilling), otherwise
+        scheduling stops at the first blocked job.
+        """
+        self.cluster = cluster
+        self.backfill = backfill
+        self._submissions: list[_PendingJob] = []
+        self._next_job_id = 1
+
+    def submit(
+        self,
+        slurm_script: str,
+        submit_time: float = 0.0,
+        runtime: Runtime = None,
+    ) -> int:
+        """
+        Submits a script as generated by `SBatch.make_slurm_script`.
+
+        Args:
+            slurm_script: the script. Only the #SBATCH directives are used.
+            submit_time: submission time in seconds.
+            runtime: actual runtime in seconds, or a function of the array task
+                id (None outside of arrays) returning it. Defaults to the time
+                limit.
+
+        Returns:
+            the simulated job id.
+        """
+        parser = SlurmScriptParser(slurm_script)
+        parser.parse()
+        slurm_params = parser.slurm_params
+        resources = SBatch(slurm_params)
+
+        task_ids: list[int | None] = [None]
+        throttle = None
+        if "--array" in slurm_params:
+            ranges, throttle = parse_array(slurm_params["--array"])
+            array_ids = array_task_ids(ranges)
+            if max(array_ids) >= self.cluster.max_array_size:
+                raise ValueError(
+                    f"Array index {max(array_ids)} is not lower than "
+                    f"MaxArraySize={self.cluster.max_array_size}."
+                )
+            task_ids = [*array_ids]
+
+        time_limit = self.cluster.default_time_limit
+        for key in ["--time", "-t"]:
+            if key in slurm_params:
+                time_limit = parse_slurm_time(slurm_params[key])
+
+        partitions = [self.cluster.default_partition]
+        for key in ["--partition", "-p"]:
+            if key in slurm_params:
+                partitions = str(slurm_params[key]).split(",")
+
+        n_nodes = resources.get_num_nodes()
+        node_names = [
+            node.name
+            for node in self.cluster.nodes
+            if not set(partitions).isdisjoint(node.partitions)
+        ]
+        pending = _PendingJob(
+            self._next_job_id,
+            task_ids,
+            throttle,
+            submit_time,
+            time_limit,
+            runtime,
+            node_names,
+            n_nodes,
+            ceil(resources.get_num_cores() / n_nodes),
+            resources.get_num_gpus(),
+        )
+        all_free = self._all_free(), self._all_free(gpus=True)
+        if self._find_nodes(pending, *all_free) is None:
+            raise ValueError(
+                f"Job {pending.job_id} requests more resources than available "
+                f"in partitions {partitions}."
+            )
+        self._submissions.append(pending)
+        self._next_job_id += 1
+        return pending.job_id
+
+    def submit_sbatch(
+        self,
+        sbatch: SBatch,
+        run_command: str | Command,
+        task_id: int | None = None,
+        schedule_all_tasks: bool = False,
+        main_command_args: Mapping[str, str] | None = None,
+        submit_time: float = 0.0,
+        runtime: Runtime = None,
+    ) -> list[int]:
+        """
+        Submits the scripts that `SBatch.run` would submit.
+        """
+        slurm_scripts = sbatch.make_slurm_scripts(
+            run_command, task_id, schedule_all_tasks, main_command_args
+        )
+        return [
+            self.submit(slurm_script, submit_time, runtime)
+            for _, slurm_script in slurm_scripts
+        ]
+
+    def _all_free(self, gpus: bool = False) -> dict[str, int]:
+        if gpus:
+            return {node.name: node.gpus for node in self.cluster.nodes}
+        return {node.name: node.cpus for node in self.cluster.nodes}
+
+    def _find_nodes(
+        self,
+        pending: _PendingJob,
+        free_cpus: dict[str, int],
+        free_gpus: dict[str, int],
+        excluded: set[str] | None = None,
+    ) -> list[str] | None:
+        nodes = []
+        cpus_per_node, gpus_per_node = pending.cpus_per_node, pending.gpus_per_node
+        for name in pending.node_names:
+            if excluded is not None and name in excluded:
+                continue
+            if free_cpus[name] >= cpus_per_node and free_gpus[name] >= gpus_per_node:
+                nodes.append(name)
+                if len(nodes) == pending.n_nodes:
+                    return nodes
+        return None
+
+    def _reserve(
+        self,
+        pending: _PendingJob,
+        time: float,
+        running: list[SimulatedJob],
+        free_cpus: dict[str, int],
+        free_gpus: dict[str, int],
+    ) -> tuple[float, set[str]]:
+        """
+        Earliest start time of a blocked job and the nodes it would use.
+
+        Args:
+            running: running jobs sorted by expected end time.
+        """
+        eligible = set(pending.node_names)
+        free_cpus = {name: free_cpus[name] for name in eligible}
+        free_gpus = {name: free_gpus[name] for name in eligible}
+
+        def fits(name: str) -> bool:
+            return (
+                free_cpus[name] >= pending.cpus_per_node
+                and free_gpus[name] >= pending.gpus_per_node
+            )
+
+        # nodes that fit are only updated for the nodes released by each job
+        fitting = {name for name in eligible if fits(name)}
+        for job in running:
+            for name in job.node_names:
+                if name not in eligible:
+                    continue
+                free_cpus[name] += job.cpus_per_node
+                free_gpus[name] += job.gpus_per_node
+                if name not in fitting and fits(name):
+                    fitting.add(name)
+            if len(fitting) >= pending.n_nodes:
+                nodes = [name for name in pending.node_names if name in fitting]
+                return (
+                    max(job.expected_end_time, time),
+                    set(nodes[: pending.n_nodes]),
+                )
+        return inf, set()
+
+    def run(self) -> SimulationReport:
+        """
+        Simulates all submitted jobs until they finish.
+        """
+        for pending in self._submissions:
+            pending.reset()
+        submissions = sorted(self._submissions, key=lambda pending: pending.submit_time)
+        free_cpus = self._all_free()
+        free_gpus = self._all_free(gpus=True)
+        # (end time, start order, job, pending job)
+        events: list[tuple[float, int, SimulatedJob, _PendingJob]] = []
+        start_order = count()
+        queue: list[_PendingJob] = []
+        jobs: list[SimulatedJob] = []
+        # running jobs sorted by expected end time, kept up to date as jobs
+        # start and end
+        running: list[SimulatedJob] = []
+        end_key = attrgetter("expected_end_time")
+        # the reservation of a blocked job only changes when a job ends: jobs
+        # started meanwhile do not delay it
+        n_releases = 0
+        cached_reservation: tuple[_PendingJob, int, tuple[float, set[str]]] | None
+        cached_reservation = None
+        k = 0
+        while k < len(submissions) or len(events) or len(queue):
+            next_times = [events[0][0]] if len(events) else []
+            if k < len(submissions):
+                next_times.append(submissions[k].submit_time)
+            if not len(next_times):
+                raise RuntimeError("Pending jobs can never start.")
+            time = min(next_times)
+            while len(events) and events[0][0] <= time:
+                _, _, job, pending = heapq.heappop(events)
+                index = bisect_left(running, job.expected_end_time, key=end_key)
+                while running[index] is not job:
+                    index += 1
+                del running[index]
+                n_releases += 1
+                pending.n_running -= 1
+                for name in job.node_names:
+                    free_cpus[name] += job.cpus_per_node
+                    free_gpus[name] += job.gpus_per_node
+            while k < len(submissions) and submissions[k].submit_time <= time:
+                queue.append(submissions[k])
+                k += 1
+
+            reservation: tuple[float, set[str]] | None = None
+            for pending in queue:
+                blocked = False
+                while len(pending.task_ids):
+                    if pending.throttle is not None:
+                        if pending.n_running >= pending.throttle:
+                            break
+                    excluded = None
+                    if (
+                        reservation is not None
+                        and time + pending.time_limit > reservation[0]
+                    ):
+                        # would delay the reserved job, only use other nodes
+                        excluded = reservation[1]
+                    nodes = self._find_nodes(pending, free_cpus, free_gpus, excluded)
+                    if nodes is None:
+                        blocked = True
+                        break
+                    task_id = pending.task_ids.popleft()
+                    job = SimulatedJob(
+                        pending.job_id,
+                        task_id,
+                        pending.submit_time,
+                        time,
+                        time + pending.get_runtime(task_id),
+                        pending.time_limit,
+                        nodes,
+                        pending.cpus_per_node,
+                        pending.gpus_per_node,
+                    )
+                    for name in nodes:
+                        free_cpus[name] -= job.cpus_per_node
+                        free_gpus[name] -= job.gpus_per_node
+                    pending.n_running += 1
+                    jobs.append(job)
+                    insort(running, job, key=end_key)
+                    heapq.heappush(
+                        events, (job.end_time, next(start_order), job, pending)
+                    )
+                if blocked and reservation is None:
+                    if not self.backfill:
+                        break
+                    if (
+                        cached_reservation is None
+                        or cached_reservation[0] is not pending
+                        or cached_reservation[1] != n_releases
+                    ):
+                        cached_reservation = (
+                            pending,
+                            n_releases,
+                            self._reserve(pending, time, running, free_cpus, free_gpus),
+                        )
+                    reservation = cached_reservation[2]
+            queue = [pending for pending in queue if len(pending.task_ids)]
+        return SimulationReport(jobs, self.cluster)
@@ -1,20 +1,43 @@
 import json
 import re
+import shlex
 from typing import Any
 
+from auto_sbatch.encoding import check_encoding, decode_column
 from auto_sbatch.processes import Command
 
+_GRID_VALUES = re.compile(r"(\w+)_param=(\((.*)\)|.*)")
+_GRID_REFERENCE = re.compile(r"\$\{(\w+)_param(?:\[\$taskId\])?\}")
+
 
 class SlurmScriptParser:
-    def __init__(self, slurm_script: str, main_command: str):
+    def __init__(
+        self,
+        slurm_script: str,
+        main_command: str | None = None,
+        encoding: str = "str",
+    ):
+        """
+        Args:
+            slurm_script: the script to parse.
+            main_command: the run command used to generate the script. If None,
+                only #SBATCH directives and commands are parsed.
+            encoding: the parameter encoding used to generate the script.
+        """
+        check_encoding(encoding)
         self._slurm_script = slurm_script
         self._main_command = main_command
+        self._encoding = encoding
         self.slurm_params: dict[str, Any] = {}
         self.commands: list[Command] = []
         self.post_commands: list[Command] = []
         self.main_command: str | None = None
         self.script_name: str | None = None
         self.params: dict[str, Any] | None = None
+        # grid-search columns, only parsed with a typed encoding
+        self.grid_search_params: dict[str, list[Any]] = {}
+        # set when the script was generated with SBatch(requeue_signal_time=...)
+        self.requeue_signal_time: int | None = None
 
     def _format_main_command(self):
         possible_formats = {
@@ -25,6 +48,8 @@ class SlurmScriptParser:
             "grid_search_string": r"(.*)",
             "all_params": r"(.*)",
         }
+        if self._main_command is None:
+            return
         for key, val in possible_formats.items():
             self._main_command = self._main_command.replace("{" + key + "}", val)
 
@@ -34,16 +59,67 @@ class SlurmScriptParser:
         self._format_main_command()
         main_command = self._main_command
         has_main_command = False
+        grid_columns: dict[str, list[Any]] = {}
+        task_values: dict[str, Any] = {}
+        grid_commands: dict[str, Command] = {}
+        has_requeue_handler = False
+        in_requeue_handler = False
         for line in script_lines:
-            if line.startswith("#SBATCH"):
+            # the requeue handler and the wait of the main command are generated
+            # from requeue_signal_time
+            if line == "requeueHandler() {":
+                has_requeue_handler = True
+                in_requeue_handler = True
+                continue
+            if in_requeue_handler:
+                in_requeue_handler = line != "}"
+                continue
+            if has_requeue_handler and (
+                line.startswith("trap requeueHandler ")
+                or line in ["mainPid=$!", 'wait "$mainPid"']
+            ):
+                continue
+            if has_requeue_handler and line.endswith(" &"):
+                line = line[:-2]
+
+            if self._encoding != "str" and (values := _GRID_VALUES.fullmatch(line)):
+                if values.group(3) is not None:
+                    grid_columns[values.group(1)] = decode_column(
+                        shlex.split(values.group(3)), self._encoding
+                    )
+                else:
+                    # value of a single task
+                    task_values[values.group(1)] = decode_column(
+                        shlex.split(values.group(2)), self._encoding
+                    )[0]
+                grid_commands[values.group(1)] = Command(line)
+                self.commands.append(grid_commands[values.group(1)])
+            elif line.startswith("#SBATCH"):
                 key, val = self._parse_slurm_line(line)
                 self.slurm_params[key] = val
-            elif matches := re.match(main_command, line):
+            elif main_command is not None and (matches := re.match(main_command, line)):
                 self.main_command = line
                 self.script_name = matches.group(1)
+                if self._encoding != "str":
+                    used_variables = self._parse_typed_params(
+                        matches.group(2), grid_columns, task_values
+                    )
+                    # regenerated from grid_search_params and params
+                    self.commands = [
+                        command
+                        for command in self.commands
+                        if all(
+                            command is not grid_commands.get(variable)
+                            for variable in used_variables
+                        )
+                    ]
+                    has_main_command = True
+                    continue
                 dotlist = matches.group(2).split(" ")
                 self.params = {}
                 for match in dotlist:
+                    if not len(match):
+                        continue
                     if match.startswith('"'):
                         key, val = self._parse_slurm_line(match[1:-1])
                     else:
@@ -55,6 +131,37 @@ class SlurmScriptParser:
                 self.commands.append(Command(line))
             else:
                 self.post_commands.append(Command(line))
+        if has_requeue_handler and "--signal" in self.slurm_params:
+            signal_time = self.slurm_params["--signal"].rsplit("@", 1)[-1]
+            self.requeue_signal_time = int(signal_time)
+
+    def _parse_typed_params(
+        self,
+        dotlist: str,
+        grid_columns: dict[str, list[Any]],
+        task_values: dict[str, Any],
+    ) -> set[str]:
+        keys, values = [], []
+        task_params = {}
+        used_variables = set()
+        for arg in shlex.split(dotlist):
+            key, sep, value = arg.partition("=")
+            if not sep:
+                continue
+            if reference := _GRID_REFERENCE.fullmatch(value):
+                used_variables.add(reference.group(1))
+                if reference.group(1) in grid_columns:
+                    self.grid_search_params[key] = grid_columns[reference.group(1)]
+                elif reference.group(1) in task_values:
+                    task_params[key] = task_values[reference.group(1)]
+                else:
+                    raise ValueError(f"{value} is not defined in the script.")
+                continue
+            keys.append(key)
+            values.append(value)
+        self.params = dict(zip(keys, decode_column(values, self._encoding)))
+        self.params.update(task_params)
+        return used_variables
 
     @staticmethod
     def _parse_slurm_line(line: str) -> tuple[str, Any]:
@@ -0,0 +1,147 @@
+import unittest.mock as mock
+
+from auto_sbatch.cli import build_sbatch, load_spec, main
+from tests.utils import mock_for_tests
+
+toml_spec = """
+command = "python {script_name} {all_params}"
+script_name = "main.py"
+
+[slurm]
+"-J" = "job-name"
+"--time" = "01:00:00"
+"--array" = "auto"
+
+[params]
+lr = 0.1
+
+[grid_search]
+exclude = [{a = 1, b = 3}]
+
+[grid_search.values]
+a = [1, 2]
+b = [3, 4]
+"""
+
+yaml_spec = """
+script_name: main.py
+slurm:
+  -J: job-name
+params:
+  lr: 0.1
+"""
+
+
+def test_load_spec(tmp_path):
+    toml_path = tmp_path / "sweep.toml"
+    toml_path.write_text(toml_spec)
+    yaml_path = tmp_path / "sweep.yaml"
+    yaml_path.write_text(yaml_spec)
+
+    spec = load_spec(toml_path)
+    assert spec["slurm"]["--array"] == "auto"
+    assert spec["grid_search"]["values"]["a"] == [1, 2]
+
+    spec = load_spec(yaml_path)
+    assert spec["slurm"] == {"-J": "job-name"}
+    assert spec["params"] == {"lr": 0.1}
+
+
+def test_build_sbatch(tmp_path):
+    toml_path = tmp_path / "sweep.toml"
+    toml_path.write_text(toml_spec)
+
+    sbatch = build_sbatch(load_spec(toml_path))
+    assert sbatch.num_available_jobs == 3
+    script = sbatch.make_slurm_script("python {script_name} {all_params}")
+    assert "#SBATCH --array=0-2" in script
+    assert '"lr=0.1"' in script
+
+
+@mock.patch("auto_sbatch.sbatch.Popen")
+def test_main_multiple_specs(p_open, tmp_path, capsys):
+    mock_for_tests(p_open=p_open)
+    paths = []
+    for k in range(2):
+        path = tmp_path / f"sweep_{k}.toml"
+        path.write_text(toml_spec)
+        paths.append(str(path))
+
+    assert main(paths) == 0
+    assert p_open.call_count == 2
+
+
+@mock.patch("auto_sbatch.sbatch.Popen")
+def test_main_dry_run(p_open, tmp_path, capsys):
+    path = tmp_path / "sweep.toml"
+    path.write_text(toml_spec)
+
+    assert main([str(path), "--dry-run"]) == 0
+    assert main([str(path), "--render-only"]) == 0
+    p_open.assert_not_called()
+    assert capsys.readouterr().out.count("#SBATCH --array=0-2") == 2
+
+
+def test_main_bad_spec(tmp_path, capsys):
+    path = tmp_path / "sweep.json"
+    path.write_text("{}")
+
+    assert main([str(path)]) == 1
+    assert "Unknown spec format" in capsys.readouterr().err
+
+
+def test_main_preflight(tmp_path, capsys):
+    path = tmp_path / "sweep.toml"
+    path.write_text(toml_spec + "\n[limits]\nmax_jobs = 2\n")
+
+    assert main([str(path), "--preflight"]) == 1
+    out = capsys.readouterr().out
+    assert "scheduled jobs: 3" in out
+    assert "exceeded: 3 jobs > max_jobs=2" in out
+
+    assert main([str(path)]) == 1
+    assert "Refusing to submit" in capsys.readouterr().err
+
+
+@mock.patch("auto_sbatch.sbatch.Popen")
+def test_main_invalid_specs(p_open, tmp_path, capsys):
+    mock_for_tests(p_open=p_open)
+    handler_typo = tmp_path / "handler_typo.toml"
+    handler_typo.write_text(
+        toml_spec + '\n[experiment_handler]\nscript_location = "main.py"\n'
+        "setup_experment = false\n"
+    )
+    top_level_typo = tmp_path / "top_level_typo.toml"
+    top_level_typo.write_text(toml_spec.replace("[params]", "[param]"))
+    broken_yaml = tmp_path / "broken.yaml"
+    broken_yaml.write_text("slurm: [\n")
+    unknown_placeholder = tmp_path / "unknown_placeholder.toml"
+    unknown_placeholder.write_text(
+        toml_spec.replace("{all_params}", "{all_params} --ckpt {checkpoints_dir}")
+    )
+    valid = tmp_path / "valid.toml"
+    valid.write_text(toml_spec)
+
+    paths = [handler_typo, top_level_typo, broken_yaml, unknown_placeholder, valid]
+    assert main([str(path) for path in paths]) == 1
+    err = capsys.readouterr().err
+    assert f"auto-sbatch: {handler_typo}: Unknown keys in experiment_handler" in err
+    assert "setup_experment" in err
+    assert f"auto-sbatch: {top_level_typo}: Unknown keys in the spec: param." in err
+    assert f"auto-sbatch: {broken_yaml}: Invalid YAML" in err
+    assert (
+        f"auto-sbatch: {unknown_placeholder}: Unknown placeholder "
+        "{checkpoints_dir} in the run command." in err
+    )
+    # the valid spec is still submitted
+    assert p_open.call_count == 1
+
+
+def test_main_preflight_limits(tmp_path, capsys):
+    path = tmp_path / "sweep.toml"
+    path.write_text(toml_spec + "\n[limits]\nmax_jobs = 3\n")
+    assert main([str(path), "--preflight"]) == 0
+
+    path.write_text(toml_spec + "\n[limits]\nmax_job = 3\n")
+    assert main([str(path), "--preflight"]) == 1
+    assert "Unknown keys in limits: max_job." in capsys.readouterr().err
@@ -0,0 +1,122 @@
+import json
+import subprocess
+import sys
+from typing import Any
+
+import pytest
+
+from auto_sbatch import GridSearch, SBatch, SlurmScriptParser
+from auto_sbatch.encoding import (
+    decode_args,
+    decode_column,
+    encode_column,
+    format_array,
+    format_param,
+)
+
+values = [
+    1,
+    0.1,
+    1e-300,
+    None,
+    True,
+    "a b",
+    "quote \" and ' quote",
+    "$HOME `ls` \\n",
+    "line\nbreak",
+    [1, "2", [3.5]],
+    {"a": {"b": None}},
+    "é",
+]
+
+
+@pytest.mark.parametrize("encoding", ["json", "base64"])
+def test_encode_column_round_trip(encoding):
+    encoded = encode_column(values, encoding)
+    assert len(encoded) == len(values)
+    assert decode_column(encoded, encoding) == values
+
+
+@pytest.mark.parametrize("encoding", ["json", "base64"])
+def test_shell_round_trip(encoding):
+    script = f"a_param={format_array(values, encoding)}\n"
+    script += f"{sys.executable} -c "
+    script += "'import json, sys; print(json.dumps(sys.argv[1:]))' "
+    script += " ".join('"a=${a_param[' + str(k) + ']}"' for k in range(len(values)))
+    script += " " + format_param("b", values, encoding)
+    out = subprocess.run(
+        ["bash", "-c", script], check=True, capture_output=True, text=True
+    ).stdout
+    args = json.loads(out)
+    decoded = [decode_args([arg], encoding)["a"] for arg in args[:-1]]
+    assert decoded == values
+    assert decode_args(args[-1:], encoding)["b"] == values
+
+
+def test_decode_errors():
+    with pytest.raises(ValueError):
+        decode_column(["1,2"], "json")
+    with pytest.raises(ValueError):
+        decode_column(["MQ=="], "base64")
+    with pytest.raises(ValueError):
+        encode_column([1], "pickle")
+
+
+@pytest.mark.parametrize("encoding", ["json", "base64"])
+def test_parser_round_trip(encoding):
+    command = "python {script_name} {all_params}"
+    params = {"p": "x y $z", "q": [1, 2]}
+    grid: dict[str, list[Any]] = {"a": [0.1, "b`c`"], "b.c": [None, {"d": 1}]}
+    sbatch = SBatch(
+        {"--array": "auto"},
+        params,
+        script_name="main.py",
+        grid_search=GridSearch(grid),
+        param_encoding=encoding,
+    )
+    parser = SlurmScriptParser(sbatch.make_slurm_script(command), command, encoding)
+    parser.parse()
+    assert parser.params == params
+    assert parser.grid_search_params == GridSearch(grid).combinations
+
+    sbatch = SBatch(
+        {},
+        params,
+        script_name="main.py",
+        grid_search=GridSearch(grid),
+        param_encoding=encoding,
+    )
+    parser = SlurmScriptParser(
+        sbatch.make_slurm_script(command, task_id=3), command, encoding
+    )
+    parser.parse()
+    assert parser.params == {**params, "a": "b`c`", "b.c": {"d": 1}}
+
+
+def test_decode_malformed_values():
+    with pytest.raises(ValueError):
+        decode_column(["[1", "2],3"], "json")
+
+
+@pytest.mark.parametrize("encoding", ["json", "base64"])
+def test_from_slurm_script_round_trip(encoding):
+    command = "python {script_name} {all_params}"
+    grid: dict[str, list[Any]] = {"a": [1, "x y"], "b.c": [None, [1]]}
+    sbatch = SBatch(
+        {"--array": "auto"},
+        {"lr": 0.1},
+        script_name="main.py",
+        grid_search=GridSearch(grid),
+        param_encoding=encoding,
+    )
+    script = sbatch.make_slurm_script(command)
+    rebuilt = SBatch.from_slurm_script(script, command, encoding)
+    assert rebuilt.num_available_jobs == 4
+    rebuilt_script = rebuilt.make_slurm_script(command)
+
+    lines, rebuilt_lines = script.split("\n"), rebuilt_script.split("\n")
+    assert rebuilt_lines[-1] == lines[-1]
+    assert "${a_param[$taskId]}" in rebuilt_lines[-1]
+    for line in lines:
+        if "_param=(" in line:
+            assert rebuilt_lines.count(line) == 1
@@ -46,3 +46,20 @@ def test_set_grid_combination_exclude_extra_val():
     with pytest.raises(ValueError):
         gs = GridSearch({"a": [1, 2]}, exclude)
         gs.get_combinations()
+
+
+def test_job_params():
+    gs = GridSearch(args)
+    assert gs.job_params(0) == {"a": 1, "b": 3}
+    assert gs.job_params(3) == {"a": 2, "b": 4}
+    with pytest.raises(ValueError):
+        gs.job_params(4)
+
+
+def test_from_combinations():
+    gs = GridSearch.from_combinations({"a": [1, 1, 2], "b": [3, 4, 3]})
+    assert gs.n_jobs == 3
+    assert gs.job_params(2) == {"a": 2, "b": 3}
+    assert "a" in gs
+    with pytest.raises(ValueError):
+        GridSearch.from_combinations({"a": [1], "b": [3, 4]})
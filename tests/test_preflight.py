@@ -0,0 +1,137 @@
+import math
+
+import pytest
+
+from auto_sbatch import (
+    ExperimentHandler,
+    GridSearch,
+    PreflightError,
+    PreflightLimits,
+    SBatch,
+)
+from auto_sbatch.preflight import array_task_ids, parse_array, parse_slurm_time
+from tests.utils import make_array_sbatch
+
+
+def test_parse_slurm_time():
+    assert parse_slurm_time("30") == 30 * 60
+    assert parse_slurm_time("30:15") == 30 * 60 + 15
+    assert parse_slurm_time("01:00:00") == 3600
+    assert parse_slurm_time("1-12") == 36 * 3600
+    assert parse_slurm_time("1-00:30") == 24 * 3600 + 30 * 60
+    assert parse_slurm_time("2-01:00:10") == 49 * 3600 + 10
+    assert parse_slurm_time("UNLIMITED") == math.inf
+    assert parse_slurm_time("infinite") == math.inf
+    with pytest.raises(ValueError, match="Invalid SLURM time"):
+        parse_slurm_time("1:00:00:00")
+    with pytest.raises(ValueError, match="Invalid SLURM time"):
+        parse_slurm_time("forever")
+
+
+def test_parse_array():
+    ranges, throttle = parse_array("0-9%2")
+    assert ranges == [(0, 9, 1)]
+    assert throttle == 2
+    ranges, throttle = parse_array("1,3,10-14:2")
+    assert throttle is None
+    assert array_task_ids(ranges) == [1, 3, 10, 12, 14]
+
+
+def test_preflight_report():
+    sbatch = make_array_sbatch(20, **{"--time": "02:00:00", "-c": 4, "--gres": "gpu:2"})
+    report = sbatch.preflight("python {script_name} {all_params}")
+
+    assert report.n_tasks == 20
+    assert report.n_submissions == 1
+    assert report.n_jobs == 20
+    assert report.array_ranges == [(0, 19, 1)]
+    assert report.max_script_bytes > 0
+    assert report.core_hours == 20 * 4 * 2
+    assert report.gpu_hours == 20 * 2 * 2
+    assert report.rsync_bytes is None
+
+
+def test_preflight_sequential_tasks():
+    sbatch = SBatch(
+        {"--time": "01:00:00"},
+        script_name="main.py",
+        grid_search=GridSearch({"a": [1, 2, 3]}),
+    )
+    report = sbatch.preflight("python {script_name} {all_params}")
+    assert report.n_jobs == 1
+    assert report.core_hours == 1
+
+    report = sbatch.preflight(
+        "python {script_name} {all_params}", schedule_all_tasks=True
+    )
+    assert report.n_submissions == 3
+    assert report.n_jobs == 3
+    assert len(report.script_bytes) == 3
+
+
+def test_preflight_limits(capsys):
+    sbatch = make_array_sbatch(20, **{"--time": "02:00:00"})
+    with pytest.raises(PreflightError):
+        sbatch.run(
+            "python {script_name} {all_params}",
+            limits=PreflightLimits(max_array_size=10),
+        )
+    with pytest.raises(PreflightError):
+        sbatch.run(
+            "python {script_name} {all_params}",
+            limits=PreflightLimits(max_core_hours=10),
+        )
+    sbatch.run(
+        "python {script_name} {all_params}",
+        dry_run=True,
+        limits=PreflightLimits(max_jobs=20, max_core_hours=40),
+    )
+
+
+def test_preflight_rsync_volume(tmp_path):
+    (tmp_path / "main.py").write_text("a" * 100)
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "object").write_text("b" * 1000)
+    handler = ExperimentHandler("main.py", tmp_path, setup_experiment=False)
+    assert handler.work_directory_size() == 100
+
+    sbatch = SBatch({"--time": "01:00:00"}, script_name="main.py")
+    sbatch.configure_from_experiment_handler(handler, prepare=False)
+    report = sbatch.preflight("python {script_name} {all_params}")
+    assert report.rsync_bytes == 100
+
+
+def test_preflight_rsync_patterns(tmp_path):
+    work_directory = tmp_path / "project"
+    (work_directory / "data" / "raw").mkdir(parents=True)
+    (work_directory / "main.py").write_text("a" * 100)
+    (work_directory / "model.ckpt").write_text("b" * 1000)
+    (work_directory / "data" / "raw" / "file").write_text("c" * 1000)
+    (work_directory / "data" / "processed").write_text("d" * 10)
+    handler = ExperimentHandler(
+        "main.py",
+        work_directory,
+        setup_experiment=False,
+        exclude_in_rsync=["*.ckpt", "data/raw"],
+    )
+    assert handler.work_directory_size() == 110
+
+    handler = ExperimentHandler(
+        "main.py",
+        work_directory,
+        setup_experiment=False,
+        exclude_in_rsync=["/project/data/", "main.py/"],
+    )
+    assert handler.work_directory_size() == 1100
+
+
+def test_preflight_unlimited_time():
+    sbatch = make_array_sbatch(20, **{"--time": "UNLIMITED", "-c": 4})
+    report = sbatch.preflight("python {script_name} {all_params}")
+    assert report.core_hours == math.inf
+    assert report.gpu_hours == 0
+    assert "core-hours: unlimited (--time=UNLIMITED)" in report.summary()
+
+    assert report.exceeded_limits(PreflightLimits(max_gpu_hours=10)) == []
+    with pytest.raises(PreflightError, match="unlimited"):
+        report.check(PreflightLimits(max_core_hours=10))
@@ -0,0 +1,128 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from auto_sbatch import ExperimentHandler, GridSearch, SBatch, SlurmScriptParser
+
+child_script = """
+import signal, sys, time
+
+def on_signal(signum, frame):
+    open(sys.argv[1], "w").write("checkpoint")
+    sys.exit(0)
+
+signal.signal(signal.SIGUSR1, on_signal)
+open(sys.argv[1] + ".started", "w").write("")
+time.sleep(30)
+"""
+
+
+def test_requeue_script():
+    sbatch = SBatch(
+        {"--time": "01:00:00"}, script_name="main.py", requeue_signal_time=60
+    )
+    script = sbatch.make_slurm_script("python {script_name} {all_params}")
+    lines = script.split("\n")
+    assert "#SBATCH --signal=B:USR1@60" in lines
+    assert "trap requeueHandler USR1" in lines
+    assert lines[-3:] == ["python main.py  &", "mainPid=$!", 'wait "$mainPid"']
+
+
+def test_requeue_stable_job_directory():
+    handler = ExperimentHandler(
+        "test_requeue.py", Path(__file__).absolute().parent, setup_experiment=False
+    )
+    sbatch = SBatch(script_name="main.py", requeue_signal_time=60)
+    with pytest.warns(UserWarning, match="stable_job_directory"):
+        sbatch.configure_from_experiment_handler(handler, prepare=False)
+    assert handler.stable_job_directory
+    script = sbatch.make_slurm_script("python {script_name} {all_params}")
+    assert "jobId=${jobId:-$SLURM_JOB_ID}" in script
+    assert 'if [ ! -d "$runWorkdirJob/tests" ]; then' in script
+
+
+def test_requeue_signal_forwarding(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    scontrol = bin_dir / "scontrol"
+    scontrol.write_text(f'#!/bin/sh\necho "$@" > {tmp_path / "scontrol.out"}\n')
+    scontrol.chmod(0o755)
+    (tmp_path / "child.py").write_text(child_script)
+    checkpoint = tmp_path / "checkpoint"
+
+    sbatch = SBatch(requeue_signal_time=60, script_name=str(tmp_path / "child.py"))
+    script = sbatch.make_slurm_script(f"{sys.executable} {{script_name}} {checkpoint}")
+    env = dict(os.environ, PATH=f"{bin_dir}:{os.environ['PATH']}", SLURM_JOB_ID="7")
+    process = subprocess.Popen(["sh", "-c", script], env=env)
+    for _ in range(100):
+        if Path(str(checkpoint) + ".started").exists():
+            break
+        time.sleep(0.05)
+    process.send_signal(signal.SIGUSR1)
+    assert process.wait(timeout=10) == 0
+
+    assert checkpoint.read_text() == "checkpoint"
+    assert (tmp_path / "scontrol.out").read_text() == "requeue 7\n"
+
+
+def test_requeue_signal_conflict():
+    with pytest.raises(ValueError):
+        SBatch({"--signal": "USR2@60"}, requeue_signal_time=60)
+
+
+def test_requeue_sequential_tasks():
+    command = "python {script_name} {all_params}"
+    sbatch = SBatch(
+        script_name="main.py",
+        grid_search=GridSearch({"a": [1, 2]}),
+        requeue_signal_time=60,
+    )
+    with pytest.raises(ValueError, match="sequentially"):
+        sbatch.make_slurm_script(command)
+    # one task per job
+    assert len(sbatch.make_slurm_scripts(command, schedule_all_tasks=True)) == 2
+    assert "a_param=2" in sbatch.make_slurm_script(command, task_id=1)
+
+    sbatch = SBatch(
+        {"--array": "auto"},
+        script_name="main.py",
+        grid_search=GridSearch({"a": [1, 2]}),
+        requeue_signal_time=60,
+    )
+    assert "trap requeueHandler USR1" in sbatch.make_slurm_script(command)
+
+
+def test_requeue_parse_script():
+    command = "python {script_name} {all_params}"
+    sbatch = SBatch(
+        {"--time": "01:00:00"},
+        {"lr": 0.1},
+        script_name="main.py",
+        requeue_signal_time=60,
+    )
+    sbatch.add_command("echo start", post=True)
+    script = sbatch.make_slurm_script(command)
+
+    parser = SlurmScriptParser(script, command)
+    parser.parse()
+    assert parser.main_command == 'python main.py "lr=0.1"'
+    assert parser.params == {"lr": 0.1}
+    assert parser.requeue_signal_time == 60
+    assert [c.get() for c in parser.post_commands] == ["echo start"]
+    assert not any("requeue" in c.get() for c in parser.commands)
+
+    rebuilt = SBatch.from_slurm_script(script, command).make_slurm_script(command)
+    lines = rebuilt.split("\n")
+    assert lines.count("#SBATCH --signal=B:USR1@60") == 1
+    assert lines.count("trap requeueHandler USR1") == 1
+    assert lines[-4:] == [
+        'python main.py "lr=0.1" &',
+        "mainPid=$!",
+        'wait "$mainPid"',
+        "echo start",
+    ]
@@ -0,0 +1,103 @@
+import subprocess
+import sys
+import unittest.mock as mock
+from typing import Any
+
+import pytest
+
+from auto_sbatch import GridSearch, SBatch
+from auto_sbatch.results import (
+    collect_results,
+    save_results,
+    task_record_commands,
+    write_grid,
+)
+from tests.utils import mock_for_tests
+
+
+def _run_task(results_dir, task_id, command):
+    pre_commands, post_commands = task_record_commands(results_dir)
+    script = "\n".join(
+        [f"taskId={task_id}", "SLURM_JOB_ID=42"]
+        + pre_commands
+        + [command]
+        + post_commands
+    )
+    return subprocess.run(["bash", "-c", script]).returncode
+
+
+def test_record_script():
+    sbatch = SBatch(
+        {"--array": "auto"},
+        script_name="main.py",
+        grid_search=GridSearch({"a": [1, 2]}),
+        results_dir="/tmp/results",
+    )
+    script = sbatch.make_slurm_script("python {script_name} {all_params}")
+    lines = script.split("\n")
+    main_line = lines.index('python main.py "a=${a_param[$taskId]}"')
+    assert lines[main_line - 1] == "taskStart=$(date +%s.%N)"
+    assert lines[main_line + 1] == "taskStatus=$?"
+    assert "/tmp/results/task_${taskId}.json" in lines[-2]
+    assert lines[-1] == '(exit "$taskStatus")'
+
+
+def test_collect_results(tmp_path):
+    grid_search = GridSearch({"a": [1, 2, 3], "b": ["x"]})
+    write_grid(tmp_path, grid_search)
+    log_command = (
+        f"{sys.executable} -c "
+        '"from auto_sbatch.results import log_metrics; '
+        'log_metrics(loss=0.5); log_metrics(acc=1)"'
+    )
+    assert _run_task(tmp_path, 0, log_command) == 0
+    assert _run_task(tmp_path, 2, "false") == 1
+
+    columns = collect_results(tmp_path, workers=2)
+    assert columns["task_id"] == [0, 2]
+    assert columns["job_id"] == ["42", "42"]
+    assert columns["status"] == [0, 1]
+    assert all(duration >= 0 for duration in columns["duration"])
+    assert columns["params/a"] == [1, 3]
+    assert columns["params/b"] == ["x", "x"]
+    assert columns["metrics/loss"] == [0.5, None]
+    assert columns["metrics/acc"] == [1, None]
+
+
+def test_save_results_npz(tmp_path):
+    np = pytest.importorskip("numpy")
+    columns: dict[str, list[Any]] = {"task_id": [0, 1], "metrics/loss": [0.5, None]}
+    save_results(columns, tmp_path / "results.npz")
+    data = np.load(tmp_path / "results.npz")
+    assert data["task_id"].tolist() == [0, 1]
+    assert np.isnan(data["metrics/loss"][1])
+
+
+def test_save_results_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        save_results({"task_id": [0]}, tmp_path / "results.csv")
+
+
+def test_record_keeps_exit_status(tmp_path):
+    for command, return_code in [("false", 1), ("true", 0)]:
+        sbatch = SBatch(script_name="main.py", results_dir=tmp_path)
+        script = sbatch.make_slurm_script(command + " {script_name}")
+        process = subprocess.run(["sh", "-c", script], env={"SLURM_JOB_ID": "1"})
+        assert process.returncode == return_code
+        assert (tmp_path / "task_0.json").exists()
+
+
+@mock.patch("auto_sbatch.sbatch.Popen")
+def test_grid_written_on_submission_only(p_open, tmp_path):
+    mock_for_tests(p_open=p_open)
+    sbatch = SBatch(
+        {"--array": "auto"},
+        script_name="main.py",
+        grid_search=GridSearch({"a": [1, 2]}),
+        results_dir=tmp_path,
+    )
+    sbatch.run("python {script_name} {all_params}", dry_run=True)
+    assert not (tmp_path / "grid.json").exists()
+
+    sbatch.run("python {script_name} {all_params}")
+    assert (tmp_path / "grid.json").exists()
@@ -0,0 +1,92 @@
+import pytest
+
+from auto_sbatch import SBatch
+from auto_sbatch.simulator import Cluster, Node, Simulator
+from tests.utils import make_array_sbatch
+
+command = "python {script_name} {all_params}"
+
+
+def test_simulate_array():
+    simulator = Simulator(Cluster.uniform(2, cpus=4))
+    simulator.submit_sbatch(make_array_sbatch(16, **{"-c": 2}), command)
+    report = simulator.run()
+
+    assert report.n_jobs == 16
+    # 4 tasks run at the same time
+    assert report.makespan == 4 * 3600
+    assert report.cpu_utilization == 1
+    assert report.max_wait == 3 * 3600
+
+
+def test_simulate_throttle_and_runtime():
+    simulator = Simulator(Cluster.uniform(2, cpus=4))
+    simulator.submit_sbatch(
+        make_array_sbatch(4, **{"--array": "0-3%1"}), command, runtime=lambda task: 60
+    )
+    report = simulator.run()
+
+    assert report.makespan == 4 * 60
+    assert [job.array_task_id for job in report.jobs] == [0, 1, 2, 3]
+
+
+def test_simulate_gpus_and_partitions():
+    cluster = Cluster(
+        [
+            Node("cpu0", cpus=8, partitions=["cpu"]),
+            Node("gpu0", cpus=8, gpus=2, partitions=["gpu"]),
+        ]
+    )
+    simulator = Simulator(cluster)
+    simulator.submit_sbatch(
+        make_array_sbatch(4, **{"--gres": "gpu:1", "--partition": "gpu"}), command
+    )
+    report = simulator.run()
+
+    assert report.makespan == 2 * 3600
+    assert report.gpu_utilization == 1
+    assert all(job.node_names == ["gpu0"] for job in report.jobs)
+
+    with pytest.raises(ValueError):
+        simulator.submit_sbatch(
+            make_array_sbatch(4, **{"--gres": "gpu:1", "--partition": "cpu"}), command
+        )
+
+
+def test_simulate_max_array_size():
+    simulator = Simulator(Cluster.uniform(1, cpus=1, max_array_size=10))
+    with pytest.raises(ValueError):
+        simulator.submit_sbatch(make_array_sbatch(11), command)
+
+
+def test_simulate_backfill():
+    def make_simulator(backfill: bool) -> Simulator:
+        simulator = Simulator(Cluster.uniform(2, cpus=1), backfill=backfill)
+        # occupies one node for 2 hours
+        simulator.submit(SBatch({"--time": "02:00:00"}).make_slurm_script(command))
+        # needs both nodes
+        simulator.submit(
+            SBatch({"--time": "01:00:00", "-N": 2}).make_slurm_script(command),
+            submit_time=1,
+        )
+        # fits on the free node before the 2-node job can start
+        simulator.submit(
+            SBatch({"--time": "01:00:00"}).make_slurm_script(command),
+            submit_time=2,
+        )
+        return simulator
+
+    report = make_simulator(backfill=False).run()
+    assert report.jobs[-1].job_id == 3
+    assert report.jobs[-1].start_time == 3 * 3600
+
+    report = make_simulator(backfill=True).run()
+    small_job = [job for job in report.jobs if job.job_id == 3][0]
+    assert small_job.start_time == 2
+    assert report.makespan == 3 * 3600
+
+
+def test_simulation_can_be_rerun():
+    simulator = Simulator(Cluster.uniform(1, cpus=1))
+    simulator.submit_sbatch(make_array_sbatch(3), command)
+    assert simulator.run().makespan == simulator.run().makespan == 3 * 3600
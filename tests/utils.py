@@ -1,5 +1,7 @@
 from unittest import mock as mock
 
+from auto_sbatch import GridSearch, SBatch
+
 
 def mock_run(command):
     print(command)
@@ -17,3 +19,16 @@ def mock_for_tests(*, p_open=None, subprocess=None):
             b"Mocked communication error",
         )
         p_open.return_value = p_open_instance
+
+
+def make_array_sbatch(n_tasks: int, **slurm_params) -> SBatch:
+    """
+    SBatch of a grid-search of `n_tasks` tasks submitted as an array, with a
+    one hour time limit by default.
+    """
+    return SBatch(
+        {"--time": "01:00:00", "--array": "auto", **slurm_params},
+        {"lr": 0.1},
+        script_name="main.py",
+        grid_search=GridSearch({"a": list(range(n_tasks))}),
+    )